@@ -4,16 +4,51 @@
 
 import sys
 import ctypes
+from ctypes import wintypes
+import os
+import msvcrt
+import tempfile
+
+# ============================================================================
+# Win32 API
+# ============================================================================
+
+# Bound once with explicit prototypes instead of going through ctypes.windll per call
+user32 = ctypes.WinDLL('user32', use_last_error=True)
+
+_MessageBoxW = user32.MessageBoxW
+_MessageBoxW.argtypes = [wintypes.HWND, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.UINT]
+_MessageBoxW.restype = ctypes.c_int
+
+_GetForegroundWindow = user32.GetForegroundWindow
+_GetForegroundWindow.argtypes = []
+_GetForegroundWindow.restype = wintypes.HWND
+
+_GetWindowTextLengthW = user32.GetWindowTextLengthW
+_GetWindowTextLengthW.argtypes = [wintypes.HWND]
+_GetWindowTextLengthW.restype = ctypes.c_int
+
+_GetWindowTextW = user32.GetWindowTextW
+_GetWindowTextW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ctypes.c_int]
+_GetWindowTextW.restype = ctypes.c_int
 
 # ============================================================================
 # Single Instance Check
 # ============================================================================
 
+_instance_lock = None  # Held open for the life of the process; Windows drops the lock on exit
+
 def ensure_single_instance():
     """Exit if another instance is already running."""
-    mutex = ctypes.windll.kernel32.CreateMutexW(None, False, "Global\\BarcodeScannerMutex")
-    if ctypes.windll.kernel32.GetLastError() == 183:
-        ctypes.windll.user32.MessageBoxW(0, "Barcode Scanner is already running.\nCheck your system tray.", "Already Running", 0x40)
+    global _instance_lock
+    try:
+        _instance_lock = open(os.path.join(tempfile.gettempdir(), "BarcodeScanner.lock"), 'w')
+    except OSError:
+        return  # No usable temp dir - run without the single-instance guard
+    try:
+        msvcrt.locking(_instance_lock.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        _MessageBoxW(0, "Barcode Scanner is already running.\nCheck your system tray.", "Already Running", 0x40)
         sys.exit(0)
 
 # ============================================================================
@@ -26,16 +61,17 @@ try:
     import usb.util
     import usb.backend.libusb1
     import webbrowser
-    import time
-    import os
     import json
+    import queue
+    import logging
+    import logging.handlers
     from pystray import Icon, Menu, MenuItem
     from PIL import Image, ImageDraw, ImageFont
     import threading
     
     libusb_backend = usb.backend.libusb1.get_backend(find_library=libusb_package.find_library)
 except ImportError as e:
-    ctypes.windll.user32.MessageBoxW(0, f"Import error:\n\n{e}", "Error", 0x10)
+    _MessageBoxW(0, f"Import error:\n\n{e}", "Error", 0x10)
     sys.exit(1)
 
 # ============================================================================
@@ -44,8 +80,25 @@ except ImportError as e:
 
 VENDOR_ID = 0x05E0
 PRODUCT_ID = 0x1200
+TRANSFERS_IN_FLIGHT = 4  # Interrupt IN transfers kept queued on the scanner endpoint
+DEBUG = False  # Log extra diagnostics from the USB read thread
 URL_TEMPLATE = "https://lms.3shape.com/pages/admin/case_list.asp?page=case_search_result&cmd=search_result&searchbox_text={barcode}"
 
+# ============================================================================
+# Logging
+# ============================================================================
+
+# Records go through a queue to a listener thread, so console writes never
+# block the USB read or barcode threads
+log = logging.getLogger('scanner')
+log.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+log.propagate = False
+_log_queue = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+if sys.stdout is None:
+    log.disabled = True  # Windowed build - there is no console to write to
+
 # ============================================================================
 # Settings Persistence
 # ============================================================================
@@ -71,36 +124,40 @@ def save_settings(settings):
         with open(get_config_path(), 'w') as f:
             json.dump(settings, f)
     except Exception as e:
-        print(f"⚠️ Could not save settings: {e}")
+        log.warning("⚠️ Could not save settings: %s", e)
 
-def create_icon_image(connected, enabled=True):
-    """Create an emoji-based system tray icon."""
-    size = 64
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Pick emoji based on state (single character emojis work better)
-    if not connected:
-        emoji = "⏸"  # Paused/disconnected
-    elif enabled:
-        emoji = "🔗"  # Link mode (opens URLs)
-    else:
-        emoji = "⌨"  # Keyboard mode
-    
-    # Try to load Segoe UI Emoji font (Windows emoji font)
+def load_emoji_font():
+    """Load the Segoe UI Emoji font (Windows emoji font)."""
     try:
-        font = ImageFont.truetype("seguiemj.ttf", 56)
+        return ImageFont.truetype("seguiemj.ttf", 56)
     except:
         try:
-            font = ImageFont.truetype("C:\\Windows\\Fonts\\seguiemj.ttf", 56)
+            return ImageFont.truetype("C:\\Windows\\Fonts\\seguiemj.ttf", 56)
         except:
-            font = ImageFont.load_default()
+            return ImageFont.load_default()
+
+def render_emoji_icon(emoji, font):
+    """Render a single emoji as a system tray icon."""
+    size = 64
+    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
     
     # Draw centered using anchor
     draw.text((size // 2, size // 2), emoji, font=font, anchor="mm", embedded_color=True)
     
     return img
 
+# Icons are rendered once at startup, keyed by (connected, enabled)
+# (single character emojis work better)
+_EMOJI_FONT = load_emoji_font()
+_ICON_DISCONNECTED = render_emoji_icon("⏸", _EMOJI_FONT)  # Paused/disconnected
+ICONS = {
+    (False, False): _ICON_DISCONNECTED,
+    (False, True): _ICON_DISCONNECTED,
+    (True, True): render_emoji_icon("🔗", _EMOJI_FONT),  # Link mode (opens URLs)
+    (True, False): render_emoji_icon("⌨", _EMOJI_FONT),  # Keyboard mode
+}
+
 # HID scancode to character (US keyboard layout)
 HID_CHARS = {
     0x28: '\n',  # Enter
@@ -124,65 +181,331 @@ HID_SHIFT_CHARS = {
     0x33: ':', 0x34: '"', 0x35: '~', 0x36: '<', 0x37: '>', 0x38: '?',
 }
 
-def hid_to_char(code, shift=False):
+def _build_hid_table(shift):
+    """Build a 256-entry scancode -> ASCII lookup table (0 = no character)."""
+    table = bytearray(256)
     # Letters a-z / A-Z
-    if 0x04 <= code <= 0x1D:
-        c = chr(code - 0x04 + ord('a'))
-        return c.upper() if shift else c
+    for code in range(0x04, 0x1E):
+        table[code] = ord('A' if shift else 'a') + code - 0x04
     # Numbers 1-9, 0
-    if 0x1E <= code <= 0x27:
-        if shift:
-            return HID_SHIFT_CHARS.get(code)
-        return str(code - 0x1D) if code <= 0x26 else '0'
+    for code in range(0x1E, 0x27):
+        table[code] = ord('1') + code - 0x1E
+    table[0x27] = ord('0')
     # Symbols and special keys
-    if shift and code in HID_SHIFT_CHARS:
-        return HID_SHIFT_CHARS[code]
-    return HID_CHARS.get(code)
+    for code, char in HID_CHARS.items():
+        table[code] = ord(char)
+    if shift:
+        for code, char in HID_SHIFT_CHARS.items():
+            table[code] = ord(char)
+    return table
+
+# Index with a scancode to get its ASCII code (0 = no character)
+HID_LUT_NOSHIFT = bytes(_build_hid_table(shift=False))
+HID_LUT_SHIFT = bytes(_build_hid_table(shift=True))
 
 # ============================================================================
 # Window Detection
 # ============================================================================
 
-def get_foreground_window_title():
-    """Get the title of the currently active foreground window."""
-    hwnd = ctypes.windll.user32.GetForegroundWindow()
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+OBJID_WINDOW = 0
+WINEVENT_OUTOFCONTEXT = 0x0000
+WM_QUIT = 0x0012
+
+# Foreground windows that switch the mode (True = open URLs, False = keyboard passthrough)
+WINDOW_MODES = {
+    "ScanPark - Google Chrome": False,
+    "Page 1 | Create Courier Ticket - Google Chrome": False,
+    "Uber Central - Google Chrome": False,
+    "Case Search Results - Google Chrome": True,
+    "Case Flow - Google Chrome": True,
+}
+
+WinEventProcType = ctypes.WINFUNCTYPE(
+    None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND, wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+)
+
+_SetWinEventHook = user32.SetWinEventHook
+_SetWinEventHook.argtypes = [
+    wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProcType, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+]
+_SetWinEventHook.restype = wintypes.HANDLE
+
+_UnhookWinEvent = user32.UnhookWinEvent
+_UnhookWinEvent.argtypes = [wintypes.HANDLE]
+_UnhookWinEvent.restype = wintypes.BOOL
+
+_GetMessageW = user32.GetMessageW
+_GetMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT]
+_GetMessageW.restype = wintypes.BOOL
+
+_GetWindowThreadProcessId = user32.GetWindowThreadProcessId
+_GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+_GetWindowThreadProcessId.restype = wintypes.DWORD
+
+_PostThreadMessageW = user32.PostThreadMessageW
+_PostThreadMessageW.argtypes = [wintypes.DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+_PostThreadMessageW.restype = wintypes.BOOL
+
+def get_window_title(hwnd):
+    """Get the title of a window."""
     if not hwnd:
         return ""
     
     # Get the length of the window title
-    length = ctypes.windll.user32.GetWindowTextLengthW(hwnd)
+    length = _GetWindowTextLengthW(hwnd)
     if length == 0:
         return ""
     
     # Create a buffer and get the title
     buffer = ctypes.create_unicode_buffer(length + 1)
-    ctypes.windll.user32.GetWindowTextW(hwnd, buffer, length + 1)
+    _GetWindowTextW(hwnd, buffer, length + 1)
     return buffer.value
 
+def watch_foreground_window(on_title):
+    """Call on_title with the foreground window's title now and whenever it changes.
+    
+    Installs a WinEvent hook for foreground switches, plus one for title changes
+    (e.g. switching Chrome tabs) scoped to the foreground window's process, and
+    pumps this thread's message queue until stop_foreground_watch() posts
+    WM_QUIT to it, so it should run on its own thread.
+    """
+    name_hook = None
+    name_hook_pid = 0
+    
+    def watch_names(hwnd):
+        """Move the title-change hook to the process that owns hwnd."""
+        nonlocal name_hook, name_hook_pid
+        pid = wintypes.DWORD()
+        _GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        if pid.value == name_hook_pid:
+            return
+        if name_hook:
+            _UnhookWinEvent(name_hook)
+            name_hook = None
+        name_hook_pid = pid.value
+        if name_hook_pid:
+            name_hook = _SetWinEventHook(
+                EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE, None, on_event, name_hook_pid, 0, WINEVENT_OUTOFCONTEXT
+            )
+    
+    @WinEventProcType
+    def on_event(hook, event, hwnd, id_object, id_child, thread_id, time_ms):
+        if event == EVENT_SYSTEM_FOREGROUND:
+            watch_names(hwnd)
+            on_title(get_window_title(hwnd))
+        elif id_object == OBJID_WINDOW and hwnd == _GetForegroundWindow():
+            on_title(get_window_title(hwnd))
+    
+    foreground_hook = _SetWinEventHook(
+        EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None, on_event, 0, 0, WINEVENT_OUTOFCONTEXT
+    )
+    hwnd = _GetForegroundWindow()
+    if hwnd:
+        watch_names(hwnd)
+    on_title(get_window_title(hwnd))
+    
+    msg = wintypes.MSG()
+    while _GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+        pass
+    if name_hook:
+        _UnhookWinEvent(name_hook)
+    _UnhookWinEvent(foreground_hook)
+
+def stop_foreground_watch(thread_id):
+    """End watch_foreground_window running on the given thread."""
+    _PostThreadMessageW(thread_id, WM_QUIT, 0, 0)
+
 # ============================================================================
 # Keyboard Simulation (for passthrough mode)
 # ============================================================================
 
-VK_SHIFT = 0x10
 VK_RETURN = 0x0D
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+ULONG_PTR = ctypes.c_size_t
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ULONG_PTR)]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                ('time', wintypes.DWORD), ('dwExtraInfo', ULONG_PTR)]
+
+class HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [('uMsg', wintypes.DWORD), ('wParamL', wintypes.WORD), ('wParamH', wintypes.WORD)]
+
+class _INPUTUNION(ctypes.Union):
+    # All members are needed so sizeof(INPUT) matches what SendInput expects
+    _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT), ('hi', HARDWAREINPUT)]
+
+class INPUT(ctypes.Structure):
+    _fields_ = [('type', wintypes.DWORD), ('u', _INPUTUNION)]
+
+_SendInput = user32.SendInput
+_SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int]
+_SendInput.restype = wintypes.UINT
+
+# Reused by send_string, which only ever runs on the barcode worker thread
+_MAX_INPUTS = 256
+_INPUT_BUF = (INPUT * _MAX_INPUTS)()
 
 def send_string(text):
-    """Send alphanumeric string + Enter as keyboard input."""
+    """Send alphanumeric string + Enter as keyboard input in a single SendInput call.
+    
+    Characters are sent as Unicode key events, so the target window receives
+    them directly without VK lookups or synthesized Shift presses.
+    """
+    count = 2 * len(text) + 2
+    inputs = _INPUT_BUF if count <= _MAX_INPUTS else (INPUT * count)()
+    n = 0
+    
+    def add_key(vk, scan, flags):
+        nonlocal n
+        inp = inputs[n]
+        inp.type = INPUT_KEYBOARD
+        inp.u.ki.wVk = vk
+        inp.u.ki.wScan = scan
+        inp.u.ki.dwFlags = flags
+        n += 1
+    
     for char in text:
-        # VkKeyScanW: low byte = VK code, high byte bit 0 = shift needed
-        result = ctypes.windll.user32.VkKeyScanW(ord(char))
-        vk = result & 0xFF
-        need_shift = (result >> 8) & 1  # Check if shift is required
+        add_key(0, ord(char), KEYEVENTF_UNICODE)
+        add_key(0, ord(char), KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)
+    # Send Enter as a real key press, since many apps look for VK_RETURN
+    add_key(VK_RETURN, 0, 0)
+    add_key(VK_RETURN, 0, KEYEVENTF_KEYUP)
+    
+    _SendInput(n, inputs, ctypes.sizeof(INPUT))
+
+# ============================================================================
+# Async USB Transfers
+# ============================================================================
+
+LIBUSB_TRANSFER_TYPE_INTERRUPT = 3
+
+class _timeval(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_usec', ctypes.c_long)]
+
+def setup_async_prototypes(lib):
+    """Declare the libusb async calls that pyusb doesn't set up itself."""
+    transfer_p = ctypes.POINTER(usb.backend.libusb1._libusb_transfer)
+    lib.libusb_cancel_transfer.argtypes = [transfer_p]
+    lib.libusb_handle_events_timeout_completed.argtypes = [
+        ctypes.c_void_p, ctypes.POINTER(_timeval), ctypes.POINTER(ctypes.c_int)
+    ]
+    lib.libusb_handle_events_completed.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]
+    lib.libusb_interrupt_event_handler.argtypes = [ctypes.c_void_p]
+
+if libusb_backend is not None:
+    setup_async_prototypes(libusb_backend.lib)
+
+# Readers whose transfers libusb never gave back. Their callback and buffers
+# must outlive them, since a late completion can still fire on the shared context.
+_leaked_readers = []
+
+class InterruptReader:
+    """Keeps several interrupt IN transfers queued so the endpoint is always armed.
+
+    Each completed transfer is passed to on_data (as a memoryview of its
+    buffer) and resubmitted from the libusb callback, which runs inside
+    poll() on the calling thread.
+    """
+    
+    def __init__(self, device, endpoint, on_data):
+        self.lib = libusb_backend.lib
+        self.on_data = on_data
+        self.error = None
+        self.pending = 0
+        self.stopping = False
+        self._callback = usb.backend.libusb1._libusb_transfer_cb_fn_p(self._on_complete)
+        self._views = {}  # Buffer address -> memoryview over that transfer's buffer
+        self._transfers = []
+        
+        handle = device._ctx.managed_open().handle
+        size = endpoint.wMaxPacketSize
+        for _ in range(TRANSFERS_IN_FLIGHT):
+            buf = (ctypes.c_ubyte * size)()
+            xfer = self.lib.libusb_alloc_transfer(0)
+            t = xfer.contents
+            t.dev_handle = handle
+            t.endpoint = endpoint.bEndpointAddress
+            t.type = LIBUSB_TRANSFER_TYPE_INTERRUPT
+            t.timeout = 0  # Wait as long as it takes for the next report
+            t.length = size
+            t.callback = self._callback
+            t.buffer = ctypes.addressof(buf)
+            self._views[t.buffer] = memoryview(buf).cast('B')
+            self._transfers.append(xfer)
+    
+    def start(self):
+        for xfer in self._transfers:
+            self._submit(xfer)
+    
+    def _submit(self, xfer):
+        ret = self.lib.libusb_submit_transfer(xfer)
+        if ret < 0:
+            self.error = usb.core.USBError(f"Could not submit transfer (libusb error {ret})")
+        else:
+            self.pending += 1
+    
+    def _on_complete(self, xfer):
+        self.pending -= 1
+        t = xfer.contents
+        if t.status != usb.backend.libusb1.LIBUSB_TRANSFER_COMPLETED:
+            if t.status != usb.backend.libusb1.LIBUSB_TRANSFER_CANCELLED:
+                self.error = usb.core.USBError(f"Transfer failed (status {t.status})")
+            return
+        
+        try:
+            self.on_data(self._views[t.buffer][:t.actual_length])
+        except Exception as e:
+            self.error = e
+        finally:
+            if not self.stopping:
+                self._submit(xfer)
+    
+    def poll(self):
+        """Block until libusb has events to handle, running any completion callbacks.
+        
+        Returns early when another thread calls wake().
+        """
+        # A failed submit leaves nothing in flight, so check before blocking
+        if self.error is None:
+            ret = self.lib.libusb_handle_events_completed(libusb_backend.ctx, None)
+            if ret < 0:
+                raise usb.core.USBError(f"Event handling failed (libusb error {ret})")
+        if self.error is not None:
+            raise self.error
+    
+    def wake(self):
+        """Make a poll() blocked on another thread return."""
+        self.lib.libusb_interrupt_event_handler(libusb_backend.ctx)
+    
+    def close(self):
+        """Cancel outstanding transfers and free them once libusb has let go."""
+        self.stopping = True
+        for xfer in self._transfers:
+            self.lib.libusb_cancel_transfer(xfer)
         
-        if need_shift:
-            ctypes.windll.user32.keybd_event(VK_SHIFT, 0, 0, 0)
-        ctypes.windll.user32.keybd_event(vk, 0, 0, 0)
-        ctypes.windll.user32.keybd_event(vk, 0, 2, 0)
-        if need_shift:
-            ctypes.windll.user32.keybd_event(VK_SHIFT, 0, 2, 0)
-    # Send Enter
-    ctypes.windll.user32.keybd_event(VK_RETURN, 0, 0, 0)
-    ctypes.windll.user32.keybd_event(VK_RETURN, 0, 2, 0)
+        tv = _timeval(1, 0)
+        for _ in range(5):
+            if not self.pending:
+                break
+            self.lib.libusb_handle_events_timeout_completed(libusb_backend.ctx, ctypes.byref(tv), None)
+        
+        # Only free transfers libusb is done with. Otherwise keep this reader
+        # (and with it the callback thunk and buffers) alive for good.
+        if self.pending:
+            _leaked_readers.append(self)
+        else:
+            for xfer in self._transfers:
+                self.lib.libusb_free_transfer(xfer)
+            self._transfers = []
 
 # ============================================================================
 # USB Scanner
@@ -194,8 +517,10 @@ class USBBarcodeScanner:
         self.status_callback = status_callback
         self.device = None
         self.endpoint = None
-        self.buffer = ""
-        self.prev_keys = set()  # Track keys from previous report for debouncing
+        self.reader = None
+        self.buffer = bytearray()
+        self.prev_slots = 0  # Raw key slots of the previous report
+        self.prev_keys = 0  # Bitmask of keys from previous report (bit n = scancode n), for debouncing
     
     def connect(self):
         try:
@@ -210,21 +535,28 @@ class USBBarcodeScanner:
             
             cfg = self.device.get_active_configuration()
             intf = cfg[(0, 0)]
-            self.endpoint = usb.util.find_descriptor(
-                intf, custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_IN
-            )
+            self.endpoint = next((ep for ep in intf if ep.bEndpointAddress & usb.util.ENDPOINT_IN), None)
             
             if self.endpoint is None:
+                self.disconnect()
                 return False
             
-            print("✅ Scanner connected")
+            usb.util.claim_interface(self.device, intf)
+            self.reader = InterruptReader(self.device, self.endpoint, self._process_data)
+            self.reader.start()
+            
+            log.info("✅ Scanner connected")
             return True
             
         except usb.core.USBError as e:
-            print(f"❌ USB Error: {e}")
+            log.error("❌ USB Error: %s", e)
+            self.disconnect()
             return False
     
     def disconnect(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
         if self.device:
             try:
                 usb.util.dispose_resources(self.device)
@@ -239,70 +571,102 @@ class USBBarcodeScanner:
                 if self.device is None:
                     if not self.connect():
                         self.status_callback(False)
-                        time.sleep(2)
+                        stop_event.wait(2)  # Back off, but wake immediately on quit
                         continue
                     self.status_callback(True)
                 
                 try:
-                    data = self.endpoint.read(self.endpoint.wMaxPacketSize, timeout=100)
-                    self._process_data(data)
+                    # Reports are decoded by the transfer callbacks run inside poll()
+                    self.reader.poll()
                 except usb.core.USBError as e:
-                    if e.errno == 10060:  # Windows timeout - normal when no data
-                        continue
-                    print(f"❌ Read error: {e}")
+                    log.error("❌ Read error: %s", e)
                     self.disconnect()
                     self.status_callback(False)
-                    time.sleep(2)
+                    stop_event.wait(2)
                     
             except Exception as e:
-                print(f"❌ Error: {e}")
+                log.error("❌ Error: %s", e)
                 self.disconnect()
                 self.status_callback(False)
-                time.sleep(2)
+                stop_event.wait(2)
         
         self.disconnect()
     
+    def wake(self):
+        """Interrupt a read_loop waiting for USB events so it can see stop_event."""
+        reader = self.reader
+        if reader:
+            reader.wake()
+    
     def _process_data(self, data):
+        """Decode one HID report, given as a memoryview to avoid slice copies."""
         if len(data) < 3:
             return
         
-        # Byte 0 is modifier: bit 1 = Left Shift, bit 5 = Right Shift
-        shift = bool(data[0] & 0x22)
+        # Get current keys from this report. Key slots are filled from the
+        # front, so reading all six as one little-endian integer gives an
+        # empty report as 0 and a single key (the usual case) as a value < 0x100.
+        slots = int.from_bytes(data[2:8], 'little')
         
-        # Get current keys from this report (non-zero key codes)
-        current_keys = set(data[i] for i in range(2, min(8, len(data))) if data[i] != 0)
+        # Idle and held-key reports repeat the previous slots and can't contain new keys
+        if slots == self.prev_slots:
+            return
+        self.prev_slots = slots
+        
+        if slots <= 0xFF:
+            current_keys = 1 << slots if slots else 0
+        else:
+            current_keys = 0
+            for key in data[2:8]:
+                if key == 0:
+                    break
+                current_keys |= 1 << key
         
         # Only process newly pressed keys (not in previous report) - this debounces held keys
-        new_keys = current_keys - self.prev_keys
+        new_keys = current_keys & ~self.prev_keys
         self.prev_keys = current_keys
         
-        for key in sorted(new_keys):  # Sort for consistent ordering
-            char = hid_to_char(key, shift)
-            if char == '\n':
+        # Byte 0 is modifier: bit 1 = Left Shift, bit 5 = Right Shift
+        lut = HID_LUT_SHIFT if data[0] & 0x22 else HID_LUT_NOSHIFT
+        
+        while new_keys:
+            # Pluck the lowest set bit, so keys come out in scancode order
+            low_bit = new_keys & -new_keys
+            new_keys ^= low_bit
+            code = lut[low_bit.bit_length() - 1]
+            if code > 0x0A:  # Printable character (the common case)
+                self.buffer.append(code)
+            elif code == 0x0A:  # Enter
                 if self.buffer:
-                    print(f"📊 Scanned: {self.buffer}")
-                    self.barcode_callback(self.buffer)
-                    self.buffer = ""
-            elif char:
-                self.buffer += char
+                    barcode = self.buffer.decode('ascii')
+                    self.buffer.clear()
+                    log.debug("📊 Scanned: %s", barcode)
+                    self.barcode_callback(barcode)
 
 # ============================================================================
 # Main Application
 # ============================================================================
 
+_URL_PREFIX, _, _URL_SUFFIX = URL_TEMPLATE.partition("{barcode}")  # Split once, not per scan
+_browser = None  # Default browser controller, resolved on first use
+
 def open_url(barcode):
-    url = URL_TEMPLATE.format(barcode=barcode)
-    webbrowser.open(url)
-    print(f"🔗 Opened: {barcode}")
+    global _browser
+    url = _URL_PREFIX + barcode + _URL_SUFFIX
+    if _browser is None:
+        # Resolved once, on the barcode worker rather than at startup
+        _browser = webbrowser.get()
+    _browser.open(url, new=0, autoraise=False)
+    log.info("🔗 Opened: %s", barcode)
 
 def passthrough_barcode(barcode):
     """Send barcode as keyboard input to the active window."""
     send_string(barcode)
-    print(f"⌨️ Typed: {barcode}")
+    log.info("⌨️ Typed: %s", barcode)
 
 def show_help(icon=None, item=None):
     def _show():
-        ctypes.windll.user32.MessageBoxW(
+        _MessageBoxW(
             0,
             "Setup Instructions:\n\n"
             "1. Download Zadig: https://zadig.akeo.ie/\n"
@@ -319,6 +683,9 @@ class App:
     def __init__(self):
         self.stop_event = threading.Event()
         self.icon = None
+        self.scanner = None
+        self.foreground_thread_id = None
+        self.barcodes = queue.SimpleQueue()  # Scanned barcodes waiting for barcode_worker
         settings = load_settings()
         self.enabled = settings.get('enabled', False)  # True = open URLs, False = keyboard passthrough
         self.connected = False
@@ -329,9 +696,9 @@ class App:
             self.enabled = enabled
             save_settings({'enabled': enabled})
             mode = "URL mode" if enabled else "Keyboard mode"
-            print(f"🔄 Switched to {mode}")
+            log.info("🔄 Switched to %s", mode)
             if self.icon:
-                self.icon.icon = create_icon_image(self.connected, self.enabled)
+                self.icon.icon = ICONS[(self.connected, self.enabled)]
                 self.icon.update_menu()
         
     def handle_barcode(self, barcode):
@@ -344,22 +711,36 @@ class App:
             self.set_mode(True)
             return
         
-        # Check foreground window for auto-mode switching
-        window_title = get_foreground_window_title()
-        if window_title == "ScanPark - Google Chrome" or window_title == "Page 1 | Create Courier Ticket - Google Chrome" or window_title == "Uber Central - Google Chrome":
-            self.set_mode(False)
-        elif window_title == "Case Search Results - Google Chrome" or window_title == "Case Flow - Google Chrome":
-            self.set_mode(True)
-        # Normal barcode processing
+        # Normal barcode processing (auto-mode switching happens in on_foreground_title)
         if self.enabled:
             open_url(barcode)
         else:
             passthrough_barcode(barcode)
         
+    def on_foreground_title(self, title):
+        """Switch mode when a known window comes to the foreground."""
+        enabled = WINDOW_MODES.get(title)
+        if enabled is not None:
+            self.set_mode(enabled)
+    
+    def foreground_worker(self):
+        """Watch foreground window changes for auto-mode switching."""
+        self.foreground_thread_id = threading.get_native_id()  # Win32 thread id, for PostThreadMessageW
+        watch_foreground_window(self.on_foreground_title)
+    
+    def barcode_worker(self):
+        """Handle scanned barcodes so typing and browser launches never stall the USB read thread."""
+        while True:
+            barcode = self.barcodes.get()
+            try:
+                self.handle_barcode(barcode)
+            except Exception as e:
+                log.error("❌ Error: %s", e)
+    
     def update_status(self, connected):
         self.connected = connected
         if self.icon:
-            self.icon.icon = create_icon_image(connected, self.enabled)
+            self.icon.icon = ICONS[(connected, self.enabled)]
             # Force icon refresh on Windows
             self.icon.visible = True
     
@@ -368,12 +749,16 @@ class App:
             
     def quit(self, icon, item):
         self.stop_event.set()
+        if self.scanner:
+            self.scanner.wake()
+        if self.foreground_thread_id:
+            stop_foreground_watch(self.foreground_thread_id)
         icon.stop()
     
     def run(self):
         self.icon = Icon(
             "Barcode Scanner",
-            create_icon_image(False, self.enabled),
+            ICONS[(False, self.enabled)],
             menu=Menu(
                 MenuItem("Barcode Scanner", lambda: None, enabled=False),
                 Menu.SEPARATOR,
@@ -390,17 +775,23 @@ class App:
         
         def on_ready(icon):
             """Called when the icon is ready - start the scanner thread."""
-            print("✅ Barcode Scanner started - check system tray")
+            log.info("✅ Barcode Scanner started - check system tray")
             mode = "URL mode" if self.enabled else "Keyboard mode"
-            print(f"📋 Mode: {mode} (click tray icon to toggle)")
-            scanner = USBBarcodeScanner(self.handle_barcode, self.update_status)
-            threading.Thread(target=scanner.read_loop, args=(self.stop_event,), daemon=True).start()
+            log.info("📋 Mode: %s (click tray icon to toggle)", mode)
+            threading.Thread(target=self.barcode_worker, daemon=True).start()
+            threading.Thread(target=self.foreground_worker, daemon=True).start()
+            self.scanner = USBBarcodeScanner(self.barcodes.put_nowait, self.update_status)
+            threading.Thread(target=self.scanner.read_loop, args=(self.stop_event,), daemon=True).start()
         
         self.icon.run(setup=on_ready)
 
 def main():
     ensure_single_instance()
+    if not log.disabled:
+        _log_listener.start()
     App().run()
+    if not log.disabled:
+        _log_listener.stop()
 
 if __name__ == "__main__":
     main()